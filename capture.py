@@ -14,9 +14,15 @@ Setup: See README.md for full instructions.
 import os
 import sys
 import re
-import json
-import base64
-import requests
+import sqlite3
+import asyncio
+import hashlib
+import contextlib
+import functools
+import traceback
+import aiohttp
+import orjson
+from anthropic import AsyncAnthropic
 from datetime import datetime, timezone
 
 # --- Config ---
@@ -33,115 +39,295 @@ APOLLO_API_KEY = os.environ.get("APOLLO_API_KEY")  # Contact enrichment (email,
 
 TELEGRAM_API = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
 
+# Per-host headers, built once. Kept off the shared session so each
+# token only ever goes to its own API.
+NOTION_HEADERS = {
+    "Authorization": f"Bearer {NOTION_TOKEN}",
+    "Content-Type": "application/json",
+    "Notion-Version": "2022-06-28",
+}
+APOLLO_HEADERS = {"X-Api-Key": APOLLO_API_KEY or "", "Content-Type": "application/json"}
+EXA_HEADERS = {"x-api-key": EXA_API_KEY or "", "Content-Type": "application/json"}
+OPENAI_HEADERS = {"Authorization": f"Bearer {OPENAI_API_KEY}"}
+
+# One client for every Claude call, so its connection pool is reused
+_ANTHROPIC = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+
+# Claude and Apollo responses keyed by a hash of their inputs, reused across runs
+CACHE_DB = os.environ.get(
+    "CONTACT_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache.db"),
+)
+
+# Next getUpdates offset, carried between runs so the ack rides on the next poll
+OFFSET_FILE = os.environ.get(
+    "TELEGRAM_OFFSET_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tg_offset"),
+)
+
 
 # --- Telegram ---
 
-def get_updates():
-    """Fetch unprocessed messages from Telegram."""
-    resp = requests.get(f"{TELEGRAM_API}/getUpdates", params={"timeout": 0})
-    resp.raise_for_status()
-    return resp.json().get("result", [])
+def load_offset():
+    """Read the saved getUpdates offset, if a previous run left one."""
+    try:
+        with open(OFFSET_FILE) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
 
 
-def confirm_updates(offset):
-    """Mark updates as processed so they don't repeat."""
-    requests.get(f"{TELEGRAM_API}/getUpdates", params={"offset": offset})
+def save_offset(offset):
+    """Persist the next getUpdates offset for the following run."""
+    with open(OFFSET_FILE, "w") as f:
+        f.write(str(offset))
 
 
-def send_message(chat_id, text):
-    """Send a confirmation message back to Telegram."""
-    requests.post(f"{TELEGRAM_API}/sendMessage", json={
+async def get_updates(session, offset=None, timeout=50, limit=100):
+    """Fetch unprocessed messages from Telegram (long poll, messages only).
+
+    Passing an offset also confirms every update before it, so there is
+    no separate ack call.
+    """
+    params = {
+        "timeout": timeout,
+        "limit": limit,
+        "allowed_updates": orjson.dumps(["message"]).decode(),
+    }
+    if offset is not None:
+        params["offset"] = offset
+    async with session.get(
+        f"{TELEGRAM_API}/getUpdates",
+        params=params,
+        timeout=aiohttp.ClientTimeout(total=timeout + 10),  # must outlast the long poll
+    ) as resp:
+        resp.raise_for_status()
+        return orjson.loads(await resp.read()).get("result", [])
+
+
+async def send_message(session, chat_id, text):
+    """Send a confirmation message back to Telegram and return its message_id."""
+    async with session.post(f"{TELEGRAM_API}/sendMessage", json={
         "chat_id": chat_id,
         "text": text,
         "parse_mode": "Markdown",
-    })
+    }) as resp:
+        if resp.status != 200:
+            print(f"Telegram send error: {resp.status} — {(await resp.text())[:200]}")
+            return None
+        return orjson.loads(await resp.read()).get("result", {}).get("message_id")
 
 
-def download_file(file_id, save_path):
-    """Download any file from Telegram by file_id."""
-    resp = requests.get(f"{TELEGRAM_API}/getFile", params={"file_id": file_id})
-    resp.raise_for_status()
-    file_path = resp.json()["result"]["file_path"]
+async def edit_message(session, chat_id, message_id, text):
+    """Replace the text of a message the bot already sent."""
+    async with session.post(f"{TELEGRAM_API}/editMessageText", json={
+        "chat_id": chat_id,
+        "message_id": message_id,
+        "text": text,
+        "parse_mode": "Markdown",
+    }):
+        pass
+
+
+# file_id → (CDN download URL, size); Telegram keeps these valid for at least an hour
+_file_urls = {}
+
+# Files above this size are fetched as parallel byte ranges
+RANGE_DOWNLOAD_MIN_SIZE = 1_000_000
+RANGE_DOWNLOAD_PARTS = 4
+
+
+async def get_file_url(session, file_id):
+    """Resolve a Telegram file_id to its download URL and size, once per file_id."""
+    if file_id not in _file_urls:
+        async with session.get(f"{TELEGRAM_API}/getFile", params={"file_id": file_id}) as resp:
+            resp.raise_for_status()
+            result = orjson.loads(await resp.read())["result"]
+        _file_urls[file_id] = (
+            f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{result['file_path']}",
+            result.get("file_size") or 0,
+        )
+    return _file_urls[file_id]
+
+
+async def _download_range(session, url, fd, lo, hi):
+    """Fetch bytes lo..hi (inclusive) of url and write them at their offset."""
+    async with session.get(url, headers={"Range": f"bytes={lo}-{hi}"}) as resp:
+        if resp.status != 206:
+            raise ValueError(f"range request returned {resp.status}")
+        offset = lo
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            os.pwrite(fd, chunk, offset)
+            offset += len(chunk)
 
-    file_resp = requests.get(
-        f"https://api.telegram.org/file/bot{TELEGRAM_BOT_TOKEN}/{file_path}"
-    )
-    file_resp.raise_for_status()
 
-    with open(save_path, "wb") as f:
-        f.write(file_resp.content)
+async def _download_ranges(session, url, size, save_path):
+    """Download a file as concurrent byte ranges into a preallocated file."""
+    part = -(-size // RANGE_DOWNLOAD_PARTS)
+    ranges = [(lo, min(lo + part, size) - 1) for lo in range(0, size, part)]
+
+    fd = os.open(save_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        # Let every part settle before closing the fd, even if one fails
+        results = await asyncio.gather(
+            *(_download_range(session, url, fd, lo, hi) for lo, hi in ranges),
+            return_exceptions=True,
+        )
+    finally:
+        os.close(fd)
+
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+async def download_file(session, file_id, save_path):
+    """Download any file from Telegram by file_id, streaming it to disk."""
+    url, size = await get_file_url(session, file_id)
+
+    if size > RANGE_DOWNLOAD_MIN_SIZE:
+        try:
+            await _download_ranges(session, url, size, save_path)
+            return save_path
+        except (aiohttp.ClientError, ValueError) as e:
+            print(f"Ranged download failed, falling back to a single stream: {e}")
+
+    async with session.get(url) as file_resp:
+        file_resp.raise_for_status()
+        with open(save_path, "wb") as f:
+            async for chunk in file_resp.content.iter_chunked(64 * 1024):
+                f.write(chunk)
     return save_path
 
 
 # --- Transcription ---
 
-def transcribe_audio(file_path):
+async def transcribe_audio(session, file_path):
     """Transcribe audio via OpenAI Whisper API."""
     if not OPENAI_API_KEY:
         return None
 
     with open(file_path, "rb") as audio_file:
-        resp = requests.post(
+        form = aiohttp.FormData()
+        form.add_field("file", audio_file, filename="voice.ogg", content_type="audio/ogg")
+        form.add_field("model", "whisper-1")
+        async with session.post(
             "https://api.openai.com/v1/audio/transcriptions",
-            headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-            files={"file": ("voice.ogg", audio_file, "audio/ogg")},
-            data={"model": "whisper-1"},
-        )
-    resp.raise_for_status()
-    return resp.json()["text"]
+            headers=OPENAI_HEADERS,
+            data=form,
+        ) as resp:
+            resp.raise_for_status()
+            return orjson.loads(await resp.read())["text"]
+
+
+# --- Cache ---
+
+@contextlib.contextmanager
+def _cache_conn():
+    """Open the cache database, committing and closing it on exit."""
+    conn = sqlite3.connect(CACHE_DB)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT)")
+            yield conn
+    finally:
+        conn.close()
+
+
+def cached(fn):
+    """Memoize an async API call on an MD5 of its arguments in SQLite.
+
+    The shared HTTP session is left out of the key.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args):
+        key_args = [a for a in args if not isinstance(a, aiohttp.ClientSession)]
+        payload = orjson.dumps([fn.__name__, key_args], option=orjson.OPT_SORT_KEYS, default=str)
+        key = hashlib.md5(payload).hexdigest()
+
+        with _cache_conn() as conn:
+            row = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row:
+            print(f"Cache hit: {fn.__name__}")
+            return orjson.loads(row[0])
+
+        result = await fn(*args)
+        if result:
+            with _cache_conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                    (key, orjson.dumps(result).decode()),
+                )
+        return result
+    return wrapper
 
 
 # --- Business Card OCR ---
 
-def extract_business_card(photo_path):
-    """Use Claude vision to read a business card photo."""
-    from anthropic import Anthropic
+# Cleanup work that must finish before the event loop closes
+_background_tasks = set()
+
+
+async def _delete_upload(file_id):
+    """Delete an uploaded file from the Anthropic workspace (non-fatal)."""
+    try:
+        await _ANTHROPIC.beta.files.delete(file_id)
+    except Exception as e:
+        print(f"File delete error (non-fatal): {e}")
 
-    with open(photo_path, "rb") as f:
-        image_data = base64.b64encode(f.read()).decode("utf-8")
 
+async def extract_business_card(photo_path):
+    """Use Claude vision to read a business card photo."""
     media_type = "image/png" if photo_path.endswith(".png") else "image/jpeg"
 
-    client = Anthropic(api_key=ANTHROPIC_API_KEY)
-    message = client.messages.create(
-        model="claude-sonnet-4-5-20250929",
-        max_tokens=1024,
-        messages=[{
-            "role": "user",
-            "content": [
-                {
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": media_type,
-                        "data": image_data,
+    # Upload the raw bytes as multipart instead of base64 inside the JSON body
+    with open(photo_path, "rb") as f:
+        uploaded = await _ANTHROPIC.beta.files.upload(
+            file=(os.path.basename(photo_path), f, media_type),
+        )
+
+    try:
+        message = await _ANTHROPIC.beta.messages.create(
+            model="claude-sonnet-4-5-20250929",
+            max_tokens=1024,
+            betas=["files-api-2025-04-14"],
+            messages=[{
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image",
+                        "source": {"type": "file", "file_id": uploaded.id},
                     },
-                },
-                {
-                    "type": "text",
-                    "text": (
-                        "Extract all information from this business card. "
-                        "Return a natural sentence like: "
-                        "'Met [Name], [Title] at [Company]. Email: [email]. Phone: [phone]. Website: [url].' "
-                        "Include every detail visible on the card."
-                    ),
-                },
-            ],
-        }],
-    )
+                    {
+                        "type": "text",
+                        "text": (
+                            "Extract all information from this business card. "
+                            "Return a natural sentence like: "
+                            "'Met [Name], [Title] at [Company]. Email: [email]. Phone: [phone]. Website: [url].' "
+                            "Include every detail visible on the card."
+                        ),
+                    },
+                ],
+            }],
+        )
+    finally:
+        # Don't leave contact photos sitting in the Anthropic workspace;
+        # the delete runs off the critical path and main() waits for it
+        task = asyncio.create_task(_delete_upload(uploaded.id))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
 
     return message.content[0].text
 
 
 # --- Claude Parsing ---
 
-def parse_contact(text):
+@cached
+async def parse_contact(text):
     """Use Claude to extract structured contact info from a raw note."""
-    from anthropic import Anthropic
-
-    client = Anthropic(api_key=ANTHROPIC_API_KEY)
-
-    message = client.messages.create(
+    buffer = ""
+    async with _ANTHROPIC.messages.stream(
         model="claude-sonnet-4-5-20250929",
         max_tokens=1024,
         messages=[{
@@ -165,21 +351,42 @@ Return a JSON object with these fields (use null for anything not mentioned):
 
 Return ONLY valid JSON. No markdown, no explanation."""
         }],
-    )
-
-    response_text = message.content[0].text.strip()
+    ) as stream:
+        async for chunk in stream.text_stream:
+            buffer += chunk
+            # Stop reading as soon as the object closes — the enrichment
+            # stages can start without waiting for the stream to finalize
+            if "}" in chunk and buffer.count("{") == buffer.count("}"):
+                start, end = buffer.find("{"), buffer.rfind("}")
+                try:
+                    return orjson.loads(buffer[start:end + 1])
+                except ValueError:
+                    pass
+
+    response_text = buffer.strip()
     if response_text.startswith("```"):
         response_text = response_text.split("\n", 1)[1].rsplit("```", 1)[0].strip()
-    return json.loads(response_text)
+    return orjson.loads(response_text)
 
 
 # --- Apollo Enrichment ---
 
-def enrich_with_apollo(name, company_domain=None):
+async def enrich_with_apollo(session, name, company_domain=None):
     """Search Apollo for the contact and return enrichment data."""
     if not APOLLO_API_KEY:
         return None
 
+    # Normalized so the same person from the same company hits the cache
+    return await _apollo_search(
+        session,
+        name.strip().lower(),
+        company_domain.strip().lower() if company_domain else None,
+    )
+
+
+@cached
+async def _apollo_search(session, name, company_domain):
+    """Run the Apollo people search; only matches are cached."""
     payload = {
         "q_person_name": name,
         "page": 1,
@@ -188,17 +395,16 @@ def enrich_with_apollo(name, company_domain=None):
     if company_domain:
         payload["q_organization_domains"] = company_domain
 
-    resp = requests.post(
+    async with session.post(
         "https://api.apollo.io/api/v1/mixed_people/api_search",
-        headers={"X-Api-Key": APOLLO_API_KEY, "Content-Type": "application/json"},
+        headers=APOLLO_HEADERS,
         json=payload,
-    )
-
-    if resp.status_code != 200:
-        print(f"Apollo API error: {resp.status_code} — {resp.text[:200]}")
-        return None
+    ) as resp:
+        if resp.status != 200:
+            print(f"Apollo API error: {resp.status} — {(await resp.text())[:200]}")
+            return None
+        people = orjson.loads(await resp.read()).get("people", [])
 
-    people = resp.json().get("people", [])
     if not people:
         return None
 
@@ -219,7 +425,27 @@ def enrich_with_apollo(name, company_domain=None):
 
 # --- Exa Research ---
 
-def exa_research(name, company=None):
+async def _exa_search(session, query):
+    """Run a single Exa search and return its raw results."""
+    async with session.post(
+        "https://api.exa.ai/search",
+        headers=EXA_HEADERS,
+        json={
+            "query": query,
+            "num_results": 5,
+            "type": "neural",
+            "contents": {
+                "text": {"max_characters": 1000},
+            },
+        },
+    ) as resp:
+        if resp.status != 200:
+            print(f"Exa search error: {resp.status} — {(await resp.text())[:200]}")
+            return []
+        return orjson.loads(await resp.read()).get("results", [])
+
+
+async def exa_research(session, name, company=None):
     """Search Exa for web content about the contact."""
     if not EXA_API_KEY:
         print("No EXA_API_KEY — skipping web research")
@@ -232,40 +458,22 @@ def exa_research(name, company=None):
     else:
         queries.append(name)
 
-    all_results = []
-    seen_urls = set()
+    # Queries are independent, so fire them together
+    responses = await asyncio.gather(
+        *(_exa_search(session, query) for query in queries),
+        return_exceptions=True,
+    )
 
-    for query in queries:
-        try:
-            resp = requests.post(
-                "https://api.exa.ai/search",
-                headers={
-                    "x-api-key": EXA_API_KEY,
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "query": query,
-                    "num_results": 5,
-                    "type": "neural",
-                    "contents": {
-                        "text": {"max_characters": 1500},
-                    },
-                },
-            )
-            if resp.status_code == 200:
-                for r in resp.json().get("results", []):
-                    url = r.get("url", "")
-                    if url not in seen_urls:
-                        seen_urls.add(url)
-                        all_results.append({
-                            "title": r.get("title", ""),
-                            "url": url,
-                            "text": r.get("text", ""),
-                        })
-            else:
-                print(f"Exa search error: {resp.status_code} — {resp.text[:200]}")
-        except Exception as e:
-            print(f"Exa error (non-fatal): {e}")
+    for results in responses:
+        if isinstance(results, Exception):
+            print(f"Exa error (non-fatal): {results}")
+
+    # Keyed by URL to dedupe across queries; dicts keep first-seen order
+    all_results = list({
+        r["url"]: {"title": r.get("title", ""), "url": r["url"], "text": r.get("text", "")}
+        for results in responses if not isinstance(results, Exception)
+        for r in results if r.get("url")
+    }.values())
 
     print(f"Exa: found {len(all_results)} results across {len(queries)} queries")
     return all_results
@@ -273,29 +481,39 @@ def exa_research(name, company=None):
 
 # --- Dossier Synthesis ---
 
-def synthesize_dossier(parsed, enriched, exa_results, raw_text):
-    """Have Claude synthesize all research into a contact dossier."""
-    from anthropic import Anthropic
+# Below this much Exa text (and without an Apollo title) a dossier would be filler
+DOSSIER_MIN_RESEARCH_CHARS = 800
+
+
+@cached
+async def synthesize_dossier(parsed, enriched, exa_results, raw_text):
+    """Have Claude synthesize all research into a contact dossier.
+
+    Returns None without calling Claude when the research is too thin to
+    say anything beyond the parsed note.
+    """
+    total_exa_text = sum(len(r.get("text", "")) for r in exa_results)
+    if total_exa_text < DOSSIER_MIN_RESEARCH_CHARS and not (enriched and enriched.get("title")):
+        return None
 
     sections = [f"Original note from meeting: {raw_text}"]
 
     if parsed:
-        sections.append(f"Parsed contact info: {json.dumps(parsed)}")
+        sections.append(f"Parsed contact info: {orjson.dumps(parsed).decode()}")
 
     if enriched:
-        sections.append(f"Apollo database enrichment: {json.dumps(enriched)}")
+        sections.append(f"Apollo database enrichment: {orjson.dumps(enriched).decode()}")
 
     if exa_results:
         sections.append("Web research results:")
         for i, r in enumerate(exa_results, 1):
             sections.append(
-                f"  [{i}] {r['title']} ({r['url']})\n  {r['text'][:1000]}"
+                f"  [{i}] {r['title']} ({r['url']})\n  {r['text']}"
             )
 
     context = "\n\n".join(sections)
 
-    client = Anthropic(api_key=ANTHROPIC_API_KEY)
-    message = client.messages.create(
+    message = await _ANTHROPIC.messages.create(
         model="claude-sonnet-4-5-20250929",
         max_tokens=2048,
         messages=[{
@@ -327,17 +545,23 @@ Be direct and specific. No filler, no corporate speak. If the web research is th
 
 # --- Notion ---
 
+NOTION_MAX_CHILDREN = 100
+NOTION_TEXT_LIMIT = 2000  # characters per rich text object
+
+# Markdown patterns used on every dossier line
+_RE_BOLD_SPLIT = re.compile(r'(\*\*.*?\*\*)')
+_RE_BOLD_LINE = re.compile(r'^\*\*[^*]+\*\*\s*$')
+
+
 def _notion_paragraph(text):
     """Create a Notion paragraph block, handling the 2000 char limit."""
-    blocks = []
-    while text:
-        chunk = text[:2000]
-        text = text[2000:]
-        blocks.append({
+    return [
+        {
             "object": "block", "type": "paragraph",
-            "paragraph": {"rich_text": [{"text": {"content": chunk}}]},
-        })
-    return blocks
+            "paragraph": {"rich_text": [{"text": {"content": text[i:i + NOTION_TEXT_LIMIT]}}]},
+        }
+        for i in range(0, len(text), NOTION_TEXT_LIMIT)
+    ]
 
 
 def _notion_heading(text):
@@ -351,22 +575,86 @@ def _notion_heading(text):
 def _parse_rich_text(text):
     """Convert markdown bold (**text**) to Notion rich text annotations."""
     segments = []
-    parts = re.split(r'(\*\*.*?\*\*)', text)
+    parts = _RE_BOLD_SPLIT.split(text)
     for part in parts:
         if not part:
             continue
+        # Long runs are split across segments rather than truncated
         if part.startswith('**') and part.endswith('**'):
             content = part[2:-2]
-            if content:
+            for j in range(0, len(content), NOTION_TEXT_LIMIT):
                 segments.append({
-                    "text": {"content": content[:2000]},
+                    "text": {"content": content[j:j + NOTION_TEXT_LIMIT]},
                     "annotations": {"bold": True},
                 })
         else:
-            segments.append({"text": {"content": part[:2000]}})
+            for j in range(0, len(part), NOTION_TEXT_LIMIT):
+                segments.append({"text": {"content": part[j:j + NOTION_TEXT_LIMIT]}})
     return segments if segments else [{"text": {"content": ""}}]
 
 
+def _md_paragraph(stripped):
+    """Regular paragraph with inline bold support."""
+    return {
+        "object": "block", "type": "paragraph",
+        "paragraph": {"rich_text": _parse_rich_text(stripped)},
+    }
+
+
+def _md_bullet(stripped):
+    """Bullet item from a '- ' or '* ' line."""
+    return {
+        "object": "block", "type": "bulleted_list_item",
+        "bulleted_list_item": {"rich_text": _parse_rich_text(stripped[2:].strip())},
+    }
+
+
+def _md_hash_line(stripped):
+    """Lines starting with '#': markdown headings."""
+    # H1 heading → heading_2 (page title is h1)
+    if stripped.startswith('# '):
+        return {
+            "object": "block", "type": "heading_2",
+            "heading_2": {"rich_text": [{"text": {"content": stripped[2:].strip()[:NOTION_TEXT_LIMIT]}}]},
+        }
+    # H2 heading
+    if stripped.startswith('## '):
+        return {
+            "object": "block", "type": "heading_3",
+            "heading_3": {"rich_text": [{"text": {"content": stripped[3:].strip()[:NOTION_TEXT_LIMIT]}}]},
+        }
+    return _md_paragraph(stripped)
+
+
+def _md_dash_line(stripped):
+    """Lines starting with '-': bullets."""
+    if stripped.startswith('- '):
+        return _md_bullet(stripped)
+    return _md_paragraph(stripped)
+
+
+def _md_star_line(stripped):
+    """Lines starting with '*': bold section headings or bullets."""
+    # Standalone bold line like **Background:** → section heading
+    if _RE_BOLD_LINE.match(stripped):
+        heading_text = stripped.strip('* ').rstrip(':')
+        return {
+            "object": "block", "type": "heading_3",
+            "heading_3": {"rich_text": [{"text": {"content": heading_text[:NOTION_TEXT_LIMIT]}}]},
+        }
+    if stripped.startswith('* '):
+        return _md_bullet(stripped)
+    return _md_paragraph(stripped)
+
+
+# Line handlers keyed on the first character; anything else is a paragraph
+_MD_LINE_HANDLERS = {
+    '#': _md_hash_line,
+    '-': _md_dash_line,
+    '*': _md_star_line,
+}
+
+
 def _markdown_to_notion_blocks(markdown_text):
     """Convert a markdown dossier into native Notion blocks."""
     blocks = []
@@ -374,48 +662,11 @@ def _markdown_to_notion_blocks(markdown_text):
         stripped = line.strip()
         if not stripped:
             continue
-
-        # H1 heading → heading_2 (page title is h1)
-        if stripped.startswith('# '):
-            blocks.append({
-                "object": "block", "type": "heading_2",
-                "heading_2": {"rich_text": [{"text": {"content": stripped[2:].strip()[:2000]}}]},
-            })
-
-        # H2 heading
-        elif stripped.startswith('## '):
-            blocks.append({
-                "object": "block", "type": "heading_3",
-                "heading_3": {"rich_text": [{"text": {"content": stripped[3:].strip()[:2000]}}]},
-            })
-
-        # Standalone bold line like **Background:** → section heading
-        elif re.match(r'^\*\*[^*]+\*\*\s*$', stripped):
-            heading_text = stripped.strip('* ').rstrip(':')
-            blocks.append({
-                "object": "block", "type": "heading_3",
-                "heading_3": {"rich_text": [{"text": {"content": heading_text[:2000]}}]},
-            })
-
-        # Bullet item
-        elif stripped.startswith('- ') or stripped.startswith('* '):
-            item_text = stripped[2:].strip()
-            blocks.append({
-                "object": "block", "type": "bulleted_list_item",
-                "bulleted_list_item": {"rich_text": _parse_rich_text(item_text)},
-            })
-
-        # Regular paragraph with inline bold support
-        else:
-            blocks.append({
-                "object": "block", "type": "paragraph",
-                "paragraph": {"rich_text": _parse_rich_text(stripped)},
-            })
-
+        blocks.append(_MD_LINE_HANDLERS.get(stripped[0], _md_paragraph)(stripped))
     return blocks
 
 
-def create_notion_contact(parsed, enriched, raw_text, source, dossier=None):
+async def create_notion_contact(session, parsed, enriched, raw_text, source, dossier=None):
     """Create a contact page in the Notion database."""
     name = parsed.get("name") or "Unknown Contact"
 
@@ -481,26 +732,42 @@ def create_notion_contact(parsed, enriched, raw_text, source, dossier=None):
         if apollo_lines:
             children.extend(_notion_paragraph("\n".join(apollo_lines)))
 
-    resp = requests.post(
+    # Notion accepts at most 100 children per request
+    async with session.post(
         "https://api.notion.com/v1/pages",
-        headers={
-            "Authorization": f"Bearer {NOTION_TOKEN}",
-            "Content-Type": "application/json",
-            "Notion-Version": "2022-06-28",
-        },
+        headers=NOTION_HEADERS,
         json={
             "parent": {"database_id": NOTION_DATABASE_ID},
             "properties": properties,
-            "children": children,
+            "children": children[:NOTION_MAX_CHILDREN],
         },
-    )
-    resp.raise_for_status()
-    return resp.json()["url"]
+    ) as resp:
+        resp.raise_for_status()
+        page = orjson.loads(await resp.read())
+
+    # Appends land at the end of the page, so they must go in order
+    for i in range(NOTION_MAX_CHILDREN, len(children), NOTION_MAX_CHILDREN):
+        async with session.patch(
+            f"https://api.notion.com/v1/blocks/{page['id']}/children",
+            headers=NOTION_HEADERS,
+            json={"children": children[i:i + NOTION_MAX_CHILDREN]},
+        ) as resp:
+            resp.raise_for_status()
+
+    return page["url"]
 
 
 # --- Main ---
 
-def process_update(update):
+def _non_fatal(result, default, label):
+    """Swap an exception from a gathered optional stage for its default."""
+    if isinstance(result, Exception):
+        print(f"{label} error (non-fatal): {result}")
+        return default
+    return result
+
+
+async def process_update(update, session):
     """Process a single Telegram message."""
     message = update.get("message", {})
     chat_id = message.get("chat", {}).get("id")
@@ -517,16 +784,20 @@ def process_update(update):
 
     raw_text = None
     source = "Text"
+    # Updates run concurrently, so scratch files are keyed per update
+    update_id = update.get("update_id")
 
     # --- Photo (business card) ---
     photos = message.get("photo")
     if photos:
         best_photo = photos[-1]
         print("Downloading photo...")
-        photo_path = download_file(best_photo["file_id"], "/tmp/business_card.jpg")
+        photo_path = await download_file(
+            session, best_photo["file_id"], f"/tmp/business_card_{update_id}.jpg"
+        )
 
         print("Reading business card with Claude Vision...")
-        raw_text = extract_business_card(photo_path)
+        raw_text = await extract_business_card(photo_path)
         source = "Business Card"
 
         caption = message.get("caption", "")
@@ -539,18 +810,20 @@ def process_update(update):
     elif message.get("voice") or message.get("audio"):
         voice = message.get("voice") or message.get("audio")
         if not OPENAI_API_KEY:
-            send_message(chat_id, "Voice notes need OPENAI_API_KEY. Send text or a photo instead.")
+            await send_message(session, chat_id, "Voice notes need OPENAI_API_KEY. Send text or a photo instead.")
             return
 
         print("Downloading voice note...")
-        audio_path = download_file(voice["file_id"], "/tmp/voice_note.ogg")
+        audio_path = await download_file(
+            session, voice["file_id"], f"/tmp/voice_note_{update_id}.ogg"
+        )
 
         print("Transcribing...")
-        raw_text = transcribe_audio(audio_path)
+        raw_text = await transcribe_audio(session, audio_path)
         source = "Voice Note"
 
         if not raw_text:
-            send_message(chat_id, "Couldn't transcribe that. Try again or send text.")
+            await send_message(session, chat_id, "Couldn't transcribe that. Try again or send text.")
             return
 
         print(f"Transcription: {raw_text}")
@@ -561,7 +834,8 @@ def process_update(update):
 
         if raw_text.startswith("/"):
             if raw_text.strip() in ("/start", "/help"):
-                send_message(
+                await send_message(
+                    session,
                     chat_id,
                     "*Contact Capture Bot*\n\n"
                     "Send me any of these:\n"
@@ -578,116 +852,142 @@ def process_update(update):
 
     # --- Processing pipeline ---
     preview = raw_text[:80] + ("..." if len(raw_text) > 80 else "")
-    send_message(chat_id, f"Processing: _{preview}_")
+    await send_message(session, chat_id, f"Processing: _{preview}_")
 
     # 1. Parse with Claude
     print("Parsing with Claude...")
     try:
-        parsed = parse_contact(raw_text)
-        print(f"Parsed: {json.dumps(parsed, indent=2)}")
+        parsed = await parse_contact(raw_text)
+        print(f"Parsed: {orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode()}")
     except Exception as e:
         print(f"Parse error: {e}")
-        send_message(chat_id, "Couldn't parse contact info. Try including a name and company.")
+        await send_message(session, chat_id, "Couldn't parse contact info. Try including a name and company.")
         return
 
-    # 2. Enrich with Apollo
+    # 2 + 3. Enrich with Apollo and research with Exa — independent, so run together
     enriched = None
+    exa_results = []
     if parsed.get("name"):
-        print(f"Searching Apollo for {parsed['name']}...")
-        try:
-            enriched = enrich_with_apollo(
+        print(f"Searching Apollo and researching {parsed['name']} via Exa...")
+        enriched, exa_results = await asyncio.gather(
+            enrich_with_apollo(
+                session,
                 parsed["name"],
                 parsed.get("search_company_domain"),
-            )
-            if enriched:
-                print(f"Apollo match: {enriched.get('name')} — {enriched.get('title')}")
-            else:
-                print("Apollo: no match found")
-        except Exception as e:
-            print(f"Apollo error (non-fatal): {e}")
-
-    # 3. Research with Exa
-    exa_results = []
-    if parsed.get("name"):
-        print(f"Researching {parsed['name']} via Exa...")
-        try:
-            exa_results = exa_research(
+            ),
+            exa_research(
+                session,
                 parsed["name"],
                 parsed.get("company"),
-            )
-        except Exception as e:
-            print(f"Exa error (non-fatal): {e}")
+            ),
+            return_exceptions=True,
+        )
+        enriched = _non_fatal(enriched, None, "Apollo")
+        exa_results = _non_fatal(exa_results, [], "Exa")
+        if enriched:
+            print(f"Apollo match: {enriched.get('name')} — {enriched.get('title')}")
+        else:
+            print("Apollo: no match found")
 
     # 4. Synthesize dossier
     dossier = None
     if exa_results or enriched:
         print("Synthesizing dossier...")
         try:
-            dossier = synthesize_dossier(parsed, enriched, exa_results, raw_text)
-            print(f"Dossier: {len(dossier)} chars")
+            dossier = await synthesize_dossier(parsed, enriched, exa_results, raw_text)
+            if dossier:
+                print(f"Dossier: {len(dossier)} chars")
+            else:
+                print("Dossier skipped: research too thin")
         except Exception as e:
             print(f"Dossier synthesis error (non-fatal): {e}")
 
-    # 5. Create Notion contact card
+    # 5. Create Notion contact card in the background
     print("Creating Notion contact...")
-    try:
-        notion_url = create_notion_contact(parsed, enriched, raw_text, source, dossier)
-        print(f"Notion page: {notion_url}")
-    except Exception as e:
-        print(f"Notion error: {e}")
-        send_message(chat_id, f"Parsed the contact but Notion write failed: {e}")
-        return
+    notion_task = asyncio.create_task(
+        create_notion_contact(session, parsed, enriched, raw_text, source, dossier)
+    )
 
-    # 6. Send confirmation back to Telegram
+    # 6. Send the summary back to Telegram now, then add the link once Notion returns
     name = parsed.get("name", "Unknown")
     company = parsed.get("company", "")
     e = enriched or {}
     display_title = e.get("title") or parsed.get("title") or ""
 
-    lines = [f"*{name}*"]
-    if display_title:
-        lines[0] += f" — {display_title}"
-    if company:
-        lines.append(f"_{company}_")
-    if enriched and e.get("email"):
-        lines.append(f"Email: {e['email']}")
-    if enriched and e.get("linkedin_url"):
-        lines.append(f"[LinkedIn]({e['linkedin_url']})")
-    if dossier:
-        lines.append("\nDossier ready in Notion")
-    elif not enriched:
-        lines.append("(no Apollo match — manual lookup may be needed)")
-    if parsed.get("follow_up"):
-        lines.append(f"\n_{parsed['follow_up']}_")
-    lines.append(f"\n[Open in Notion]({notion_url})")
+    details = [
+        f"*{name}*" + (f" — {display_title}" if display_title else ""),
+        f"_{company}_" if company else None,
+        f"Email: {e['email']}" if e.get("email") else None,
+        f"[LinkedIn]({e['linkedin_url']})" if e.get("linkedin_url") else None,
+    ]
+    follow_up = f"\n_{parsed['follow_up']}_" if parsed.get("follow_up") else None
+    no_match = None if dossier or enriched else "(no Apollo match — manual lookup may be needed)"
+    # "Dossier ready" only goes out once the page actually exists
+    ready = "\nDossier ready in Notion" if dossier else no_match
+
+    summary = "\n".join(filter(None, [*details, no_match, follow_up]))
+
+    # Await both so a Telegram failure can never drop the Notion write
+    message_id, notion_url = await asyncio.gather(
+        send_message(session, chat_id, summary),
+        notion_task,
+        return_exceptions=True,
+    )
+    message_id = _non_fatal(message_id, None, "Telegram")
 
-    send_message(chat_id, "\n".join(lines))
+    if isinstance(notion_url, Exception):
+        print(f"Notion error: {notion_url}")
+        text = f"{summary}\n\nParsed the contact but Notion write failed: {notion_url}"
+    else:
+        print(f"Notion page: {notion_url}")
+        text = "\n".join(filter(None, [
+            *details, ready, follow_up, f"\n[Open in Notion]({notion_url})",
+        ]))
+
+    if message_id:
+        await edit_message(session, chat_id, message_id, text)
+    else:
+        await send_message(session, chat_id, text)
 
 
-def main():
+async def main():
     print(f"Contact Capture — {datetime.now(timezone.utc).isoformat()}")
 
-    updates = get_updates()
-    print(f"{len(updates)} pending update(s)")
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=20),
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    ) as session:
+        updates = await get_updates(session, load_offset())
+        print(f"{len(updates)} pending update(s)")
 
-    if not updates:
-        print("Nothing to process.")
-        return
+        if not updates:
+            print("Nothing to process.")
+            return
 
-    processed = 0
-    for update in updates:
-        try:
-            process_update(update)
-            processed += 1
-        except Exception as e:
-            print(f"Error on update {update.get('update_id')}: {e}")
-            import traceback
-            traceback.print_exc()
+        # All stages are network-bound, so updates are processed concurrently
+        results = await asyncio.gather(
+            *(process_update(update, session) for update in updates),
+            return_exceptions=True,
+        )
+
+        processed = 0
+        for update, result in zip(updates, results):
+            if isinstance(result, Exception):
+                print(f"Error on update {update.get('update_id')}: {result}")
+                traceback.print_exception(result)
+            else:
+                processed += 1
+
+        if _background_tasks:
+            await asyncio.gather(*_background_tasks)
 
-    last_id = updates[-1]["update_id"]
-    confirm_updates(last_id + 1)
-    print(f"Done. Processed {processed}/{len(updates)} updates.")
+        next_offset = updates[-1]["update_id"] + 1
+        save_offset(next_offset)
+        if os.environ.get("GITHUB_ACTIONS"):
+            # CI runners don't keep the offset file, so ack now with a minimal poll
+            await get_updates(session, next_offset, timeout=0, limit=1)
+        print(f"Done. Processed {processed}/{len(updates)} updates.")
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())